@@ -0,0 +1,19 @@
+# cython: language_level=3
+# Typed C implementation of the scalar Haversine distance (km).
+#
+# Optional accelerator for the row-wise paths: build it in place with
+#   python setup.py build_ext --inplace
+# and app.py picks it up automatically, falling back to Python otherwise.
+from libc.math cimport sin, cos, sqrt, asin, fmin, M_PI
+
+
+cpdef double haversine(double lat1, double lon1, double lat2, double lon2) nogil:
+    cdef double R = 6371.0
+    cdef double phi1 = lat1 * M_PI / 180.0
+    cdef double phi2 = lat2 * M_PI / 180.0
+    cdef double dphi = (lat2 - lat1) * M_PI / 180.0
+    cdef double dlam = (lon2 - lon1) * M_PI / 180.0
+    cdef double a = sin(dphi / 2) ** 2 + cos(phi1) * cos(phi2) * sin(dlam / 2) ** 2
+    # asin form is one transcendental cheaper than atan2; clamp guards
+    # float overshoot for near-antipodal pairs
+    return 2 * R * asin(sqrt(fmin(a, 1.0)))
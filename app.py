@@ -1,54 +1,109 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import math
 import io
 import os
 import altair as alt
-import base64
+from collections import namedtuple
 
 # =======================
-# Embed & Apply Custom Font to All Text & Headings
+# Apply Custom Font to All Text & Headings
 # =======================
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-FONT_PATH = os.path.join(BASE_DIR, "fonts", "MyFont.otf")
+FONT_PATH = os.path.join(BASE_DIR, "static", "MyFont.otf")
 
-def load_font_base64(path):
-    with open(path, "rb") as f:
-        return base64.b64encode(f.read()).decode('utf-8')
-
-if os.path.exists(FONT_PATH):
-    font_data = load_font_base64(FONT_PATH)
-    st.markdown(f"""
-    <style>
-    @font-face {{
+# The font is served from Streamlit's static directory (enableStaticServing
+# in .streamlit/config.toml), so the browser fetches and caches it over
+# HTTP once instead of receiving a base64 blob in the page on every rerun.
+#
+# All static CSS lives in this one block: the font face plus the classes
+# the metric cards use instead of per-card inline styles. (A session_state
+# guard can't make this once-per-session — Streamlit prunes elements that
+# aren't re-emitted on a rerun — but the block is ~1 KB.)
+_FONT_FACE = """
+    @font-face {
         font-family: 'MyFont';
-        src: url(data:font/otf;base64,{font_data}) format('opentype');
-    }}
-    html, body, [class*="css"], .block-container {{
+        src: url('./app/static/MyFont.otf') format('opentype');
+    }
+    html, body, [class*="css"], .block-container {
         font-family: 'MyFont', system-ui !important;
-    }}
+    }
+""" if os.path.exists(FONT_PATH) else ""
+
+APP_CSS = f"""
+    <style>
+    {_FONT_FACE}
+    .metric-grid {{ display: grid; grid-template-columns: repeat(3, 1fr); gap: 10px; }}
+    .metric-card {{ font-family: 'MyFont', system-ui; }}
+    .metric-card .metric-label {{ font-size: 0.875rem; color: #ccc; }}
+    .metric-card .metric-value {{ font-size: 2rem; }}
     </style>
-    """, unsafe_allow_html=True)
-else:
-    st.warning("Custom font file not found at fonts/MyFont.otf. Using default font.")
+"""
+
+st.markdown(APP_CSS, unsafe_allow_html=True)
+if not os.path.exists(FONT_PATH):
+    st.warning("Custom font file not found at static/MyFont.otf. Using default font.")
+
+# Prefer the Rust-backed calamine engine for reading uploads — much faster
+# than openpyxl's pure-Python XML parsing on large workbooks.
+try:
+    import python_calamine  # noqa: F401
+    EXCEL_ENGINE = "calamine"
+except ImportError:
+    EXCEL_ENGINE = "openpyxl"
 
 # Emission factors (kg CO2e per passenger·km)
 DOMESTIC_FACTOR = 0.03350 + 0.27257
 INTERNATIONAL_FACTOR = 0.02162 + 0.17580
+# Indexed by is_domestic for branchless selection in the bulk path
+_FACTORS = np.array([INTERNATIONAL_FACTOR, DOMESTIC_FACTOR], dtype=np.float64)
+
+# Airport store: struct-of-arrays — one IATA→row-index map plus contiguous
+# NumPy arrays, so a lookup is a single hash + integer indexing and the bulk
+# path can fancy-index whole columns at once.
+AirportDB = namedtuple("AirportDB", "idx lat lon is_in lat_rad lon_rad cos_lat")
 
-# Load and cache airport data
 @st.cache_data
-def load_airport_data(path: str = None) -> dict:
+def load_airport_data(path: str = None) -> AirportDB:
     if path is None:
         path = os.path.join(BASE_DIR, "data", "airports.csv")
-    df = pd.read_csv(path, usecols=["iata_code", "latitude_deg", "longitude_deg", "iso_country"])
+    cols = ["iata_code", "latitude_deg", "longitude_deg", "iso_country"]
+    # Keep a Parquet sidecar next to the CSV: binary columnar reads skip
+    # the text parsing entirely on every cold start after the first.
+    parquet_path = path.replace(".csv", ".parquet")
+    if os.path.exists(parquet_path) and os.path.getmtime(parquet_path) >= os.path.getmtime(path):
+        df = pd.read_parquet(parquet_path, columns=cols)
+    else:
+        df = pd.read_csv(path, usecols=cols,
+                         dtype={"iata_code": "string", "iso_country": "string"})
+        df.to_parquet(parquet_path, compression="zstd")
     df = df.dropna(subset=["iata_code"])
     df["iso_country"] = df["iso_country"].fillna("").astype(str).str.upper()
     df["iata_code"] = df["iata_code"].str.upper()
-    return {row.iata_code: {"lat": row.latitude_deg, "lon": row.longitude_deg, "country": row.iso_country}
-            for row in df.itertuples()}
+    # One row per code, keeping the last occurrence to match dict(zip(...))
+    # semantics below — this guarantees dict position, categorical code and
+    # array row stay aligned even if the CSV ever gains duplicate codes.
+    df = df.drop_duplicates("iata_code", keep="last")
+    lat_arr = df["latitude_deg"].to_numpy(np.float64)
+    lon_arr = df["longitude_deg"].to_numpy(np.float64)
+    # Packed boolean instead of country strings — the only classification
+    # the app makes is domestic (IN) vs international.
+    is_in = (df["iso_country"] == "IN").to_numpy(np.bool_)
+    # Coordinates never change, so hoist the radians conversion and the
+    # cosines out of every distance computation.
+    lat_rad = np.radians(lat_arr)
+    lon_rad = np.radians(lon_arr)
+    cos_lat = np.cos(lat_rad)
+    index_map = dict(zip(df["iata_code"], range(len(df))))
+    return AirportDB(index_map, lat_arr, lon_arr, is_in, lat_rad, lon_rad, cos_lat)
+
+db = load_airport_data()
 
-airport_data = load_airport_data()
+# Categorical dtype whose category order matches the SoA row order: casting
+# a code column to it yields row indices directly (unknown codes → -1),
+# hashing each string once in C instead of a Python dict lookup per value.
+IATA_DTYPE = pd.CategoricalDtype(categories=list(db.idx))
 
 # Distance function (Haversine)
 def haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
@@ -57,8 +112,136 @@ def haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     Δφ = math.radians(lat2 - lat1)
     Δλ = math.radians(lon2 - lon1)
     a = math.sin(Δφ/2)**2 + math.cos(φ1) * math.cos(φ2) * math.sin(Δλ/2)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return R * c
+    # asin form saves an atan2 + sqrt; clamp guards float overshoot for
+    # near-antipodal pairs
+    return 2 * R * math.asin(math.sqrt(min(a, 1.0)))
+
+# Optional accelerators for the scalar haversine, fastest first: the
+# Cython extension (python setup.py build_ext --inplace), then a numba
+# JIT of the Python version; plain Python remains the fallback.
+try:
+    from _haversine import haversine
+except ImportError:
+    try:
+        from numba import njit
+        haversine = njit(cache=True, fastmath=True)(haversine)
+    except ImportError:
+        pass
+
+# Scalar Haversine over airport row indices, reusing the radians/cosines
+# precomputed at load time — the per-call conversions and cosines disappear
+# from the row-wise paths as well. The degree-based haversine above stays
+# as the general-purpose (and optionally accelerated) entry point.
+def haversine_pre(i, j):
+    R = 6371
+    Δφ = db.lat_rad[j] - db.lat_rad[i]
+    Δλ = db.lon_rad[j] - db.lon_rad[i]
+    a = math.sin(Δφ/2)**2 + db.cos_lat[i] * db.cos_lat[j] * math.sin(Δλ/2)**2
+    return 2 * R * math.asin(math.sqrt(min(a, 1.0)))
+
+# Vectorized Haversine over airport row indices — one compiled pass instead
+# of a Python call per row, reusing the radians/cosines precomputed at load
+# time so the hot loop is just two sines, a multiply and an arcsin.
+def haversine_idx(i, j):
+    R = 6371
+    Δφ = db.lat_rad[j] - db.lat_rad[i]
+    Δλ = db.lon_rad[j] - db.lon_rad[i]
+    a = np.sin(Δφ/2)**2 + db.cos_lat[i] * db.cos_lat[j] * np.sin(Δλ/2)**2
+    return 2 * R * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+# Optional fused bulk kernel: one parallel pass per unique pair computing
+# distance and the domestic flag together, with no NumPy temporaries.
+# compute_bulk_metrics falls back to the NumPy path when numba is absent.
+try:
+    from numba import njit as _njit, prange as _prange
+
+    @_njit(parallel=True, fastmath=True, cache=True)
+    def _bulk_kernel(lat_rad, lon_rad, cos_lat, is_in, i, j, out_d, out_dom):
+        for k in _prange(i.shape[0]):
+            Δφ = lat_rad[j[k]] - lat_rad[i[k]]
+            Δλ = lon_rad[j[k]] - lon_rad[i[k]]
+            a = math.sin(Δφ/2)**2 + cos_lat[i[k]] * cos_lat[j[k]] * math.sin(Δλ/2)**2
+            out_d[k] = 2 * 6371 * math.asin(math.sqrt(min(a, 1.0)))
+            out_dom[k] = is_in[i[k]] and is_in[j[k]]
+except ImportError:
+    _bulk_kernel = None
+
+# All-pairs great-circle distances (km) between a set of IATA codes,
+# broadcast over the precomputed radian arrays in one compiled pass —
+# for matrix-style views over an upload's airports. Cached since the
+# airport set is usually stable across reruns.
+@st.cache_data
+def airport_distance_matrix(codes: tuple) -> pd.DataFrame:
+    idx = np.array([db.idx[c] for c in codes])
+    Δφ = db.lat_rad[idx][:, None] - db.lat_rad[idx][None, :]
+    Δλ = db.lon_rad[idx][:, None] - db.lon_rad[idx][None, :]
+    a = np.sin(Δφ/2)**2 + db.cos_lat[idx][:, None] * db.cos_lat[idx][None, :] * np.sin(Δλ/2)**2
+    dist = 2 * 6371 * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+    return pd.DataFrame(dist, index=list(codes), columns=list(codes))
+
+# Fully vectorized metrics for the from/to bulk path: map both code
+# columns to airport row indices, compute each unique pair once, and
+# write distance, travel type and emissions back in one fused pass.
+def compute_bulk_metrics(df: pd.DataFrame) -> pd.DataFrame:
+    idx_from = df['from'].astype(IATA_DTYPE).cat.codes.to_numpy()   # unknown code → -1
+    idx_to = df['to'].astype(IATA_DTYPE).cat.codes.to_numpy()
+    valid = (idx_from >= 0) & (idx_to >= 0)
+    i = np.where(valid, idx_from, 0).astype(np.int64)
+    j = np.where(valid, idx_to, 0).astype(np.int64)
+
+    # Repeat routes are common in travel logs: encode each (from, to)
+    # pair as one integer, compute every unique pair once, then
+    # broadcast the results back through the inverse index.
+    n = len(db.lat_rad)
+    uniq, inv = np.unique(i * n + j, return_inverse=True)
+    ui, uj = uniq // n, uniq % n
+
+    if _bulk_kernel is not None:
+        dist_u = np.empty(ui.shape[0], np.float64)
+        dom_u = np.empty(ui.shape[0], np.bool_)
+        _bulk_kernel(db.lat_rad, db.lon_rad, db.cos_lat, db.is_in,
+                     ui, uj, dist_u, dom_u)
+        dist, is_dom = dist_u[inv], dom_u[inv]
+    else:
+        dist = haversine_idx(ui, uj)[inv]
+        is_dom = (db.is_in[ui] & db.is_in[uj])[inv]
+    factor = _FACTORS[is_dom.view(np.int8)]
+    trips_arr = df['trips'].to_numpy(np.float64)
+    df['distance_km'] = np.where(valid, dist, np.nan)
+    df['travel_type'] = np.where(valid, np.where(is_dom, 'Domestic', 'International'), None)
+    df['emissions(tCO2e)'] = np.where(valid, dist * factor * trips_arr / 1000.0, np.nan)
+    return df
+
+# Result serialization is cached so widget interactions don't rebuild the
+# download payload on every rerun; CSV is the default since it serializes
+# far faster than xlsx.
+@st.cache_data
+def to_csv_bytes(df: pd.DataFrame) -> bytes:
+    return df.to_csv(index=False).encode('utf-8')
+
+@st.cache_data
+def to_xlsx_bytes(df: pd.DataFrame) -> bytes:
+    buf = io.BytesIO()
+    # xlsxwriter serializes a few times faster than openpyxl. (Its
+    # constant_memory mode would be lighter still, but pandas writes
+    # cells column-by-column, which that mode can't accept.)
+    df.to_excel(buf, index=False, engine='xlsxwriter')
+    return buf.getvalue()
+
+@st.cache_data
+def top_polluting_routes(df: pd.DataFrame, n: int = 10) -> pd.DataFrame:
+    # Aggregate server-side so the chart ships at most n rows to the
+    # browser; Altair's default data transformer rejects frames above
+    # 5,000 rows outright.
+    return (df.groupby('route', sort=False)['emissions(tCO2e)']
+              .sum().nlargest(n).reset_index())
+
+# Metric-card fragment, filled per card and joined in one pass
+_CARD_TEMPLATE = """
+        <div id="{id}" class="metric-card">
+        <div id="{id}-label" class="metric-label">{label}</div>
+        <div id="{id}-value" class="metric-value">{value}</div>
+        </div>"""
 
 # Streamlit UI
 st.markdown(
@@ -80,14 +263,13 @@ with col2:
 if st.button("Calculate Distance"):
     if not from_code or not to_code:
         st.warning("Please enter both From and To IATA codes.")
-    elif from_code not in airport_data or to_code not in airport_data:
-        missing = [c for c in (from_code, to_code) if c not in airport_data]
+    # One .get per code instead of a membership test plus a second lookup
+    elif (i := db.idx.get(from_code)) is None or (j := db.idx.get(to_code)) is None:
+        missing = [c for c in (from_code, to_code) if db.idx.get(c) is None]
         st.error(f"Unknown IATA code(s): {', '.join(missing)}")
     else:
-        a1 = airport_data[from_code]
-        a2 = airport_data[to_code]
-        distance = haversine(a1['lat'], a1['lon'], a2['lat'], a2['lon'])
-        travel_type = "Domestic" if a1['country']=='IN' and a2['country']=='IN' else "International"
+        distance = haversine_pre(i, j)
+        travel_type = "Domestic" if db.is_in[i] and db.is_in[j] else "International"
         emissions_t = distance * (DOMESTIC_FACTOR if travel_type=='Domestic' else INTERNATIONAL_FACTOR)
         st.success(
             f"Distance between {from_code} and {to_code}: {distance:.1f} km ({travel_type}) — Emissions: {emissions_t:.2f} kgCO₂e"
@@ -126,151 +308,115 @@ with st.container():
     col_t2.download_button("Multi‑leg", buf_b, "template_route.xlsx",
                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
     
+# Parse an uploaded workbook and compute every derived column. Cached on
+# the raw bytes: every widget interaction reruns the whole script, and
+# this turns those reruns into memoized O(1) returns instead of a fresh
+# parse + compute.
+@st.cache_data(show_spinner=False)
+def load_and_compute(file_bytes: bytes) -> pd.DataFrame:
+    df = pd.read_excel(io.BytesIO(file_bytes), engine=EXCEL_ENGINE)
+    df.columns = [col.strip().lower() for col in df.columns]
+    # Normalize the code columns once, vectorized — downstream lookups
+    # then see clean uppercase keys without per-row strip()/upper().
+    for col in ('from', 'to'):
+        if col in df.columns:
+            df[col] = df[col].astype('string').str.strip().str.upper()
+    if 'route' in df.columns:
+        df['route'] = df['route'].astype('string').str.upper().str.replace(' ', '', regex=False)
+    # Arrow-backed dtypes: compact strings and a faster groupby path
+    # for the aggregations further down.
+    df = df.convert_dtypes(dtype_backend='pyarrow')
+    if 'route' in df.columns:
+        # Ensure 'trips' exists and is integer
+        if 'trips' in df.columns:
+            df['trips'] = df['trips'].fillna(1).astype(int)
+        else:
+            df['trips'] = 1
+
+        # Explode dash-separated routes into one row per leg, align each
+        # origin with its destination, and run the vectorized kernel over
+        # every leg of every route at once — per-route totals come back
+        # from a single groupby instead of a Python loop per leg. Each
+        # leg keeps its own domestic/international factor, as before.
+        codes = df['route'].str.split('-').explode()
+        dests = codes.groupby(level=0).shift(-1)
+        has_leg = codes.notna() & dests.notna()     # drops each route's tail
+        org, dst = codes[has_leg], dests[has_leg]
+
+        i = org.astype(IATA_DTYPE).cat.codes.to_numpy()   # unknown code → -1
+        j = dst.astype(IATA_DTYPE).cat.codes.to_numpy()
+        known = (i >= 0) & (j >= 0)
+        ii = np.where(known, i, 0).astype(np.int64)
+        jj = np.where(known, j, 0).astype(np.int64)
+        leg_km = np.where(known, haversine_idx(ii, jj), np.nan)
+        leg_dom = db.is_in[ii] & db.is_in[jj]
+        leg_em = leg_km * _FACTORS[leg_dom.view(np.int8)]
+
+        per_leg = pd.DataFrame({'km': leg_km, 'em': leg_em,
+                                'dom': leg_dom, 'bad': ~known}, index=org.index)
+        agg = per_leg.groupby(level=0).agg(
+            {'km': 'sum', 'em': 'sum', 'dom': 'all', 'bad': 'any'}).reindex(df.index)
+
+        ok = ~agg['bad'].fillna(False).astype(bool).to_numpy()   # any unknown leg → row invalid
+        km = agg['km'].fillna(0.0).to_numpy(np.float64)
+        em_kg = agg['em'].fillna(0.0).to_numpy(np.float64)
+        dom = agg['dom'].fillna(True).astype(bool).to_numpy()
+        df['distance_km'] = np.where(ok, km, np.nan)
+        df['travel_type'] = np.where(ok, np.where(dom, 'Domestic', 'International'), None)
+        df['emissions(tCO2e)'] = np.where(
+            ok, df['trips'].to_numpy(np.float64) * em_kg / 1000, np.nan)   # kg → tonnes
+
+    elif not {'from', 'to'}.issubset(df.columns):
+        raise ValueError("Excel must contain 'from' and 'to' columns.")
+    else:
+        if 'trips' in df.columns:
+            df['trips'] = df['trips'].fillna(1).astype(int)
+        else:
+            df['trips'] = 1
+
+        df = compute_bulk_metrics(df)
+
+    if 'route' not in df.columns:
+        # Codes are already normalized uppercase; arrow-backed strings
+        # keep the concatenation in native code.
+        df['route'] = (df['from'] + '→' + df['to']).astype('string[pyarrow]')
+    return df
+
 if uploaded_file:
     try:
-        df = pd.read_excel(uploaded_file)
-        df.columns = [col.strip().lower() for col in df.columns]
-        if 'route' in df.columns:
-    # Ensure 'trips' exists and is integer
-            if 'trips' in df.columns:
-                df['trips'] = df['trips'].fillna(1).astype(int)
-            else:
-                df['trips'] = 1
-
-            def compute_route_metrics(row):
-                """
-                Calculates distance and emissions for a dash-separated route
-                using the correct factor *per leg* (domestic vs international).
-                Returns:  [total_km, overall_travel_type, emissions_tCO2e]
-                """
-                codes = [c.strip().upper() for c in row["route"].split("-")]
-                total_km     = 0.0           # accumulate distance
-                total_em_kg  = 0.0           # accumulate emissions in kg
-                all_domestic = True          # flips to False on first int’l leg
-
-                for origin, dest in zip(codes, codes[1:]):
-                    a1, a2 = airport_data.get(origin), airport_data.get(dest)
-                    if not a1 or not a2:                     # unknown IATA code
-                        return pd.Series([None, None, None])
-
-                    leg_km = haversine(a1["lat"], a1["lon"], a2["lat"], a2["lon"])
-                    total_km += leg_km
-
-                    domestic_leg = (a1["country"] == "IN") and (a2["country"] == "IN")
-                    factor       = DOMESTIC_FACTOR if domestic_leg else INTERNATIONAL_FACTOR
-                    total_em_kg += leg_km * factor               # add this leg’s emissions
-
-                    if not domestic_leg:
-                        all_domestic = False
-
-                travel_type = "Domestic" if all_domestic else "International"
-                emissions_t = row.get('trips', 1) * total_em_kg / 1000                 # kg → tonnes
-                return pd.Series([total_km, travel_type, emissions_t])
-
-
-            df[['distance_km', 'travel_type', 'emissions(tCO2e)']] = df.apply(compute_route_metrics, axis=1)
-
-        elif not {'from', 'to'}.issubset(df.columns):
-            st.error("Excel must contain 'from' and 'to' columns.")
-        else:
-            df['trips'] = df.get('trips', 1).fillna(1).astype(int)
-
-            def compute_metrics(row):
-                f, t = row['from'].strip().upper(), row['to'].strip().upper()
-                if f in airport_data and t in airport_data:
-                    a1, a2 = airport_data[f], airport_data[t]
-                    dist = haversine(a1['lat'], a1['lon'], a2['lat'], a2['lon'])
-                    tt = 'Domestic' if a1['country']=='IN' and a2['country']=='IN' else 'International'
-                    em_t = dist * (DOMESTIC_FACTOR if tt=='Domestic' else INTERNATIONAL_FACTOR) * row['trips'] / 1000
-                    return pd.Series([dist, tt, em_t])
-                return pd.Series([None, None, None])
-
-            df[['distance_km','travel_type','emissions(tCO2e)']] = df.apply(compute_metrics, axis=1)
-
-        if 'route' not in df.columns:
-            df['route'] = df['from'].str.upper() + '→' + df['to'].str.upper()
-
-        # Summaries
-        total_em = df['emissions(tCO2e)'].sum()
-        dom_em = df.loc[df['travel_type']=='Domestic','emissions(tCO2e)'].sum()
-        int_em = df.loc[df['travel_type']=='International','emissions(tCO2e)'].sum()
-        total_dist = df['distance_km'].sum()
-        dom_dist = df.loc[df['travel_type']=='Domestic','distance_km'].sum()
-        int_dist = df.loc[df['travel_type']=='International','distance_km'].sum()
-        total_trips = int(df['trips'].sum())
-        dom_trips = int(df.loc[df['travel_type']=='Domestic','trips'].sum())
-        int_trips = int(df.loc[df['travel_type']=='International','trips'].sum())
+        df = load_and_compute(uploaded_file.getvalue())
+
+        # Summaries — one grouped pass over the three columns instead of a
+        # separate boolean-masked scan per total.
+        agg = df.groupby('travel_type', sort=False)[['emissions(tCO2e)', 'distance_km', 'trips']].sum()
+        empty = pd.Series(0.0, index=agg.columns)
+        dom = agg.loc['Domestic'] if 'Domestic' in agg.index else empty
+        intl = agg.loc['International'] if 'International' in agg.index else empty
+        total_em = dom['emissions(tCO2e)'] + intl['emissions(tCO2e)']
+        dom_em, int_em = dom['emissions(tCO2e)'], intl['emissions(tCO2e)']
+        total_dist = dom['distance_km'] + intl['distance_km']
+        dom_dist, int_dist = dom['distance_km'], intl['distance_km']
+        total_trips = int(df['trips'].sum())   # includes rows with unknown codes
+        dom_trips, int_trips = int(dom['trips']), int(intl['trips'])
 
         st.subheader("Key Metrics")
-        # Key Metrics rendered with custom MyFont via inline HTML and unique IDs
-        c1, c2, c3 = st.columns(3)
-        # Total Emissions
-        c1.markdown(f"""
-        <div id="metric-total-emissions" style="font-family: 'MyFont', system-ui;">
-        <div id="metric-total-emissions-label" style="font-size:0.875rem; color:#ccc;">Total Emissions</div>
-        <div id="metric-total-emissions-value" style="font-size:2rem;">{total_em:,.2f} tCO₂e</div>
-        </div>
-        """, unsafe_allow_html=True)
-        # Domestic Emissions
-        c2.markdown(f"""
-        <div id="metric-domestic-emissions" style="font-family: 'MyFont', system-ui;">
-        <div id="metric-domestic-emissions-label" style="font-size:0.875rem; color:#ccc;">Domestic Emissions</div>
-        <div id="metric-domestic-emissions-value" style="font-size:2rem;">{dom_em:,.2f} tCO₂e</div>
-        </div>
-        """, unsafe_allow_html=True)
-        # International Emissions
-        c3.markdown(f"""
-        <div id="metric-international-emissions" style="font-family: 'MyFont', system-ui;">
-        <div id="metric-international-emissions-label" style="font-size:0.875rem; color:#ccc;">International Emissions</div>
-        <div id="metric-international-emissions-value" style="font-size:2rem;">{int_em:,.2f} tCO₂e</div>
-        </div>
-        """, unsafe_allow_html=True)
-
-        c4, c5, c6 = st.columns(3)
-        # Total Distance
-        c4.markdown(f"""
-        <div id="metric-total-distance" style="font-family: 'MyFont', system-ui;">
-        <div id="metric-total-distance-label" style="font-size:0.875rem; color:#ccc;">Total Distance</div>
-        <div id="metric-total-distance-value" style="font-size:2rem;">{total_dist:,.0f} km</div>
-        </div>
-        """, unsafe_allow_html=True)
-        # Domestic Distance
-        c5.markdown(f"""
-        <div id="metric-domestic-distance" style="font-family: 'MyFont', system-ui;">
-        <div id="metric-domestic-distance-label" style="font-size:0.875rem; color:#ccc;">Total Distance(Domestice)</div>
-        <div id="metric-domestic-distance-value" style="font-size:2rem;">{dom_dist:,.0f} km</div>
-        </div>
-        """, unsafe_allow_html=True)
-        # International Distance
-        c6.markdown(f"""
-        <div id="metric-int-distance" style="font-family: 'MyFont', system-ui;">
-        <div id="metric-int-distance-label" style="font-size:0.875rem; color:#ccc;">Total Distance(International)</div>
-        <div id="metric-int-distance-value" style="font-size:2rem;">{int_dist:,.0f} km</div>
-        </div>
-        """, unsafe_allow_html=True)
-
-        c7, c8, c9 = st.columns(3)
-        # Total Trips
-        c7.markdown(f"""
-        <div id="metric-total-trips" style="font-family: 'MyFont', system-ui;">
-        <div id="metric-total-trips-label" style="font-size:0.875rem; color:#ccc;">Total Trips</div>
-        <div id="metric-total-trips-value" style="font-size:2rem;">{total_trips}</div>
-        </div>
-        """, unsafe_allow_html=True)
-        # Domestic Trips
-        c8.markdown(f"""
-        <div id="metric-domestic-trips" style="font-family: 'MyFont', system-ui;">
-        <div id="metric-domestic-trips-label" style="font-size:0.875rem; color:#ccc;">Domestic Trips</div>
-        <div id="metric-domestic-trips-value" style="font-size:2rem;">{dom_trips}</div>
-        </div>
-        """, unsafe_allow_html=True)
-        # International Trips
-        c9.markdown(f"""
-        <div id="metric-international-trips" style="font-family: 'MyFont', system-ui;">
-        <div id="metric-international-trips-label" style="font-size:0.875rem; color:#ccc;">International Trips</div>
-        <div id="metric-international-trips-value" style="font-size:2rem;">{int_trips}</div>
-        </div>
-        """, unsafe_allow_html=True)
+        # All nine metric cards (MyFont, unique IDs) in one CSS grid emitted
+        # with a single st.markdown — one protocol message instead of nine.
+        cards = [
+            ("metric-total-emissions", "Total Emissions", f"{total_em:,.2f} tCO₂e"),
+            ("metric-domestic-emissions", "Domestic Emissions", f"{dom_em:,.2f} tCO₂e"),
+            ("metric-international-emissions", "International Emissions", f"{int_em:,.2f} tCO₂e"),
+            ("metric-total-distance", "Total Distance", f"{total_dist:,.0f} km"),
+            ("metric-domestic-distance", "Total Distance(Domestice)", f"{dom_dist:,.0f} km"),
+            ("metric-int-distance", "Total Distance(International)", f"{int_dist:,.0f} km"),
+            ("metric-total-trips", "Total Trips", f"{total_trips}"),
+            ("metric-domestic-trips", "Domestic Trips", f"{dom_trips}"),
+            ("metric-international-trips", "International Trips", f"{int_trips}"),
+        ]
+        html = "<div class='metric-grid'>" + "".join(
+            _CARD_TEMPLATE.format(id=card_id, label=label, value=value)
+            for card_id, label, value in cards) + "</div>"
+        st.markdown(html, unsafe_allow_html=True)
         # Emissions Share Pie Chart (monochrome)
         st.subheader("Emissions Share: Domestic vs International")
         pie_df = pd.DataFrame({
@@ -302,19 +448,32 @@ if uploaded_file:
         """,unsafe_allow_html=True)
         # Top 10 Polluting Routes (monochrome bar, descending)
         st.subheader("Top 10 Polluting Routes")
-        top10 = df.groupby('route')['emissions(tCO2e)'].sum().reset_index().sort_values('emissions(tCO2e)',ascending=False).head(10)
-        bar = alt.Chart(top10).mark_bar(color='#444444').encode(
+        # Aggregate to ten rows before handing the data to Altair: the
+        # per-row frame would blow the 5,000-row Vega limit on big uploads,
+        # and the groupby result is cached so it doesn't re-run per rerun.
+        top = top_polluting_routes(df)
+        bar = alt.Chart(top).mark_bar(color='#444444').encode(
             x=alt.X('emissions(tCO2e):Q',title='Emissions (tCO₂e)'),
             y=alt.Y('route:N',sort='-x',title='Route'),
             tooltip=['route:N','emissions(tCO2e):Q']
         )
         st.altair_chart(bar,use_container_width=True)
         
-        st.dataframe(df)
-        buf = io.BytesIO()
-        df.to_excel(buf,index=False,engine='openpyxl')
-        buf.seek(0)
-        st.download_button("Download Results",data=buf,file_name="airport_insights.xlsx",
-                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        # Arrow-serializing the whole frame to the browser on every rerun
+        # dominates network cost for big uploads — preview the first 1000
+        # rows and leave the full results to the download buttons.
+        if len(df) > 1000:
+            st.caption(f"Showing the first 1,000 of {len(df):,} rows; download below for the full results.")
+            st.dataframe(df.head(1000), use_container_width=True)
+        else:
+            st.dataframe(df, use_container_width=True)
+        fmt = st.radio("Download as", ["CSV", "Excel"], horizontal=True)
+        if fmt == "CSV":
+            st.download_button("Download Results", data=to_csv_bytes(df),
+                               file_name="airport_insights.csv", mime="text/csv")
+        else:
+            st.download_button("Download Results", data=to_xlsx_bytes(df),
+                               file_name="airport_insights.xlsx",
+                               mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
     except Exception as e:
         st.error(f"Error processing file: {e}")
@@ -0,0 +1,9 @@
+# Builds the optional _haversine C extension:
+#   pip install cython && python setup.py build_ext --inplace
+from setuptools import setup
+from Cython.Build import cythonize
+
+setup(
+    name="air-travel-emissions-accel",
+    ext_modules=cythonize("_haversine.pyx"),
+)